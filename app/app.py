@@ -4,16 +4,53 @@ AI-Augmented DevOps Demo Application
 A simple Flask web service for demonstrating DevSecOps pipeline
 """
 
-from flask import Flask, jsonify, request, render_template_string
+from flask import Flask, Response, request
+import orjson
 import os
 import logging
+import threading
 import time
 from datetime import datetime
 
-# Configure logging
+class BatchingStreamHandler(logging.StreamHandler):
+    """
+    Stream handler that buffers formatted records and writes them in one call
+    Flushes when the buffer is full, a record at flush_level or above arrives,
+    or max_delay seconds after the first record of a batch was buffered
+    """
+
+    def __init__(self, stream=None, capacity=512, flush_level=logging.WARNING, max_delay=1.0):
+        super().__init__(stream)
+        self.capacity = capacity
+        self.flush_level = flush_level
+        self.max_delay = max_delay
+        self.pending = []
+
+    def emit(self, record):
+        try:
+            self.pending.append(self.format(record) + self.terminator)
+            if len(self.pending) >= self.capacity or record.levelno >= self.flush_level:
+                self.flush()
+            elif len(self.pending) == 1:
+                # Quiet periods must not hold records back indefinitely
+                timer = threading.Timer(self.max_delay, self.flush)
+                timer.daemon = True
+                timer.start()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        with self.lock:
+            if self.pending:
+                self.stream.write(''.join(self.pending))
+                self.pending.clear()
+            super().flush()
+
+# Configure logging; INFO traffic is batched, warnings and errors go out immediately
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[BatchingStreamHandler(capacity=int(os.environ.get('LOG_BUFFER_RECORDS', 512)))]
 )
 logger = logging.getLogger(__name__)
 
@@ -69,54 +106,98 @@ HTML_TEMPLATE = """
 </html>
 """
 
-# Application start time for uptime calculation
-START_TIME = time.time()
+# Compile the page once at import; render_template_string would re-parse it on every request
+HOME_TEMPLATE = app.jinja_env.from_string(HTML_TEMPLATE)
+
+# Application start time for uptime calculation; monotonic so clock changes don't skew it
+START_NS = time.monotonic_ns()
+
+# Rendered home page, keyed by the whole-second uptime it shows
+_home_cache = (-1, b'')
+
+# Per-process constants shared by every response instead of rebuilt per request
+ENVIRONMENT = os.environ.get('ENVIRONMENT', 'development')
+CONTAINER_ID = os.environ.get('HOSTNAME', 'localhost')
+
+FEATURES = {
+    'pre_commit_hooks': True,
+    'vulnerability_scanning': True,
+    'policy_enforcement': True,
+    'anomaly_detection': True,
+    'explainable_ai': True
+}
+
+AI_ANALYSIS = {
+    'security_scan': 'clean',
+    'content_type': 'image/jpeg',
+    'malware_detected': False,
+    'confidence': 0.97
+}
+
+# Health body up to (not including) the closing brace; the timestamp is appended per refresh
+HEALTH_PREFIX = orjson.dumps({
+    'status': 'healthy',
+    'message': 'AI-Augmented DevOps is running!',
+    'version': '1.0.0'
+})[:-1]
+
+# Probe endpoints reuse their serialized body for up to this many seconds
+RESPONSE_CACHE_TTL = 1.0
+_health_cache = (float('-inf'), b'')
+_status_cache = (float('-inf'), b'')
+
+def json_response(payload, status=200):
+    """Serialize payload with orjson instead of the stdlib-based jsonify"""
+    return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+
+def uptime_seconds():
+    """Whole seconds since the application started"""
+    return (time.monotonic_ns() - START_NS) // 1_000_000_000
 
 @app.route('/')
 def home():
-    """Main web interface"""
-    uptime_seconds = int(time.time() - START_TIME)
-    uptime_str = f"{uptime_seconds // 3600}h {(uptime_seconds % 3600) // 60}m {uptime_seconds % 60}s"
-    
-    container_info = os.environ.get('HOSTNAME', 'localhost')
-    
-    return render_template_string(
-        HTML_TEMPLATE,
-        version="1.0.0",
-        uptime=uptime_str,
-        container_info=container_info
-    )
+    """Main web interface, re-rendered at most once per second of uptime"""
+    global _home_cache
+    seconds = uptime_seconds()
+    cached_seconds, page = _home_cache
+    if seconds != cached_seconds:
+        page = HOME_TEMPLATE.render(
+            version="1.0.0",
+            uptime=f"{seconds // 3600}h {(seconds % 3600) // 60}m {seconds % 60}s",
+            container_info=CONTAINER_ID
+        ).encode()
+        _home_cache = (seconds, page)
+    return Response(page, mimetype='text/html')
 
 @app.route('/api/health')
 def health_check():
     """Health check endpoint for Kubernetes probes"""
-    return jsonify({
-        'status': 'healthy',
-        'message': 'AI-Augmented DevOps is running!',
-        'timestamp': datetime.utcnow().isoformat(),
-        'version': '1.0.0'
-    })
+    global _health_cache
+    now = time.monotonic()
+    cached_at, body = _health_cache
+    if now - cached_at >= RESPONSE_CACHE_TTL:
+        body = HEALTH_PREFIX + b',"timestamp":' + orjson.dumps(datetime.utcnow()) + b'}'
+        _health_cache = (now, body)
+    return Response(body, mimetype='application/json')
 
 @app.route('/api/status')
 def detailed_status():
     """Detailed status endpoint with metrics"""
-    uptime_seconds = int(time.time() - START_TIME)
-    
-    return jsonify({
-        'service': 'ai-devops-demo',
-        'version': '1.0.0',
-        'status': 'running',
-        'uptime_seconds': uptime_seconds,
-        'environment': os.environ.get('ENVIRONMENT', 'development'),
-        'container_id': os.environ.get('HOSTNAME', 'localhost'),
-        'features': {
-            'pre_commit_hooks': True,
-            'vulnerability_scanning': True,
-            'policy_enforcement': True,
-            'anomaly_detection': True,
-            'explainable_ai': True
-        }
-    })
+    global _status_cache
+    now = time.monotonic()
+    cached_at, body = _status_cache
+    if now - cached_at >= RESPONSE_CACHE_TTL:
+        body = orjson.dumps({
+            'service': 'ai-devops-demo',
+            'version': '1.0.0',
+            'status': 'running',
+            'uptime_seconds': uptime_seconds(),
+            'environment': ENVIRONMENT,
+            'container_id': CONTAINER_ID,
+            'features': FEATURES
+        })
+        _status_cache = (now, body)
+    return Response(body, mimetype='application/json')
 
 @app.route('/api/upload', methods=['POST'])
 def simulate_upload():
@@ -130,32 +211,27 @@ def simulate_upload():
         client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
         logger.info(f"Upload simulation from {client_ip}")
         
-        return jsonify({
+        return json_response({
             'status': 'success',
             'message': 'File processed successfully',
             'processing_time_seconds': processing_time,
-            'ai_analysis': {
-                'security_scan': 'clean',
-                'content_type': 'image/jpeg',
-                'malware_detected': False,
-                'confidence': 0.97
-            }
+            'ai_analysis': AI_ANALYSIS
         })
     
     except Exception as e:
         logger.error(f"Upload processing error: {e}")
-        return jsonify({
+        return json_response({
             'status': 'error',
             'message': 'Processing failed',
             'error': str(e)
-        }), 500
+        }, status=500)
 
 @app.route('/api/simulate-anomaly')
 def simulate_anomaly():
     """Endpoint to simulate an anomaly for testing monitoring"""
     logger.warning("🚨 SIMULATED ANOMALY: Unusual traffic pattern detected")
     
-    return jsonify({
+    return json_response({
         'status': 'anomaly_detected',
         'message': 'Simulated anomaly for testing purposes',
         'anomaly_type': 'traffic_spike',
@@ -168,4 +244,16 @@ if __name__ == '__main__':
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
     
     logger.info(f"Starting AI-Augmented DevOps Demo on port {port}")
-    app.run(host='0.0.0.0', port=port, debug=debug)
+    if debug:
+        app.run(host='0.0.0.0', port=port, debug=debug)
+    else:
+        # Serve through gunicorn with the same settings as the container
+        for handler in logging.getLogger().handlers:
+            handler.flush()
+        app_dir = os.path.dirname(os.path.abspath(__file__))
+        try:
+            os.execvp('gunicorn', ['gunicorn', '--chdir', app_dir,
+                                   '--config', os.path.join(app_dir, 'gunicorn_conf.py'), 'app:app'])
+        except FileNotFoundError:
+            logger.warning("gunicorn not found; falling back to the Flask development server")
+            app.run(host='0.0.0.0', port=port, debug=debug)
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Gunicorn configuration for the AI-Augmented DevOps Demo Application
+Pre-forks gevent workers that share the listening socket
+"""
+
+import os
+
+# Patch before the app is preloaded so workers inherit cooperative sockets and sleeps
+from gevent import monkey
+monkey.patch_all()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# One worker per CPU unless WEB_CONCURRENCY pins it (e.g. under a pod CPU limit)
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+worker_class = 'gevent'
+worker_connections = 1000
+timeout = 30
+
+# Import the app once in the master and fork afterwards, so START_NS, the
+# compiled template and the pre-serialized JSON are copy-on-write shared
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
@@ -4,32 +4,84 @@ AI-Powered Anomaly Detection for DevOps Pipeline
 Simulates ML-based anomaly detection with explainable AI reporting
 """
 
-import json
-import random
+import sys
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from dataclasses import dataclass
-from typing import List, Dict, Tuple
+from enum import IntEnum
+from operator import attrgetter, itemgetter
+from typing import IO, List, Dict, Optional, Tuple, Union
 import logging
 
+import numpy as np
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Metric labels as (name, value) pairs, so data points stay immutable and hashable
+Labels = Tuple[Tuple[str, str], ...]
+
+class Severity(IntEnum):
+    """Anomaly severity; lower values sort first in reports"""
+    CRITICAL = 0
+    HIGH = 1
+    MEDIUM = 2
+    LOW = 3
+    NONE = 4
+
+@dataclass(slots=True, frozen=True)
 class MetricData:
     """Represents a metric data point"""
     timestamp: datetime
     service: str
     metric_name: str
     value: float
-    labels: Dict[str, str]
+    labels: Labels
 
 @dataclass
+class MetricBatch:
+    """
+    Column-oriented batch of metric data points
+    Row i is (timestamps[i], services[service_codes[i]],
+    metric_names[metric_codes[i]], values[i], label_sets[label_codes[i]])
+    """
+    timestamps: np.ndarray  # datetime64[us]
+    service_codes: np.ndarray  # int32 indexes into services
+    metric_codes: np.ndarray  # int16 indexes into metric_names
+    values: np.ndarray  # float64
+    label_codes: np.ndarray  # int32 indexes into label_sets
+    services: Tuple[str, ...]
+    metric_names: Tuple[str, ...]
+    label_sets: Tuple[Labels, ...]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @classmethod
+    def from_metrics(cls, metrics: List[MetricData]) -> "MetricBatch":
+        """Build a batch from individual metric data points"""
+        services: Dict[str, int] = {}
+        metric_names: Dict[str, int] = {}
+        label_sets: Dict[Labels, int] = {}
+        count = len(metrics)
+        return cls(
+            timestamps=np.array([metric.timestamp for metric in metrics], dtype="datetime64[us]"),
+            service_codes=np.fromiter((services.setdefault(metric.service, len(services)) for metric in metrics), dtype=np.int32, count=count),
+            metric_codes=np.fromiter((metric_names.setdefault(metric.metric_name, len(metric_names)) for metric in metrics), dtype=np.int16, count=count),
+            values=np.fromiter((metric.value for metric in metrics), dtype=np.float64, count=count),
+            label_codes=np.fromiter((label_sets.setdefault(metric.labels, len(label_sets)) for metric in metrics), dtype=np.int32, count=count),
+            # Interned names match the detector's dict keys by identity
+            services=tuple(map(sys.intern, services)),
+            metric_names=tuple(map(sys.intern, metric_names)),
+            label_sets=tuple(label_sets)
+        )
+
+@dataclass(slots=True)
 class AnomalyResult:
     """Represents an anomaly detection result"""
     detected: bool
     confidence: float
-    severity: str
+    severity: Severity
     metric: str
     service: str
     explanation: str
@@ -51,207 +103,247 @@ class AIAnomalyDetector:
             "memory_usage": 0.4,  # 40% baseline memory usage
             "request_rate": 100,  # 100 req/sec baseline
         }
+        # Metrics with a simulated ML model; others are not analyzed
+        self._handlers = {
+            "error_rate": self._analyze_error_rate,
+            "response_time": self._analyze_response_time,
+            "cpu_usage": self._analyze_cpu_usage,
+        }
         
-    def detect_anomalies(self, metrics: List[MetricData]) -> List[AnomalyResult]:
+    def detect_anomalies(self, metrics: Union[MetricBatch, List[MetricData]]) -> List[AnomalyResult]:
         """
         Detect anomalies in the provided metrics
-        This simulates AI-based anomaly detection
+        This simulates AI-based anomaly detection; values are scored per metric
+        name with vectorized NumPy checks and results are only built for
+        the rows flagged as anomalous
         """
-        anomalies = []
+        if not isinstance(metrics, MetricBatch):
+            metrics = MetricBatch.from_metrics(metrics)
         
-        for metric in metrics:
-            anomaly = self._analyze_metric(metric)
-            if anomaly.detected:
-                anomalies.append(anomaly)
-                
-        return anomalies
-    
-    def _analyze_metric(self, metric: MetricData) -> AnomalyResult:
-        """Analyze a single metric for anomalies"""
-        baseline = self.baseline_metrics.get(metric.metric_name, 0)
+        flagged = []
+        for code, metric_name in enumerate(metrics.metric_names):
+            rows = np.flatnonzero(metrics.metric_codes == code)
+            found = self._analyze_metric(metric_name, metrics, rows)
+            if found is not None:
+                flagged.extend(found)
         
+        # Report anomalies in the order their metrics arrived
+        flagged.sort(key=itemgetter(0))
+        return [anomaly for _, anomaly in flagged]
+    
+    def _analyze_metric(self, metric_name: str, batch: MetricBatch,
+                        rows: np.ndarray) -> Optional[List[Tuple[int, AnomalyResult]]]:
+        """Analyze all rows of one metric; None when nothing is anomalous"""
         # Simulate ML model prediction
-        if metric.metric_name == "error_rate":
-            return self._analyze_error_rate(metric, baseline)
-        elif metric.metric_name == "response_time":
-            return self._analyze_response_time(metric, baseline)
-        elif metric.metric_name == "cpu_usage":
-            return self._analyze_cpu_usage(metric, baseline)
-        else:
-            return AnomalyResult(
-                detected=False,
-                confidence=0.0,
-                severity="none",
-                metric=metric.metric_name,
-                service=metric.service,
-                explanation="No anomaly detected",
-                recommended_actions=[],
-                impact_estimate="None"
-            )
+        handler = self._handlers.get(metric_name)
+        if handler is None:
+            return None
+        return handler(batch, rows, self.baseline_metrics.get(metric_name, 0))
     
-    def _analyze_error_rate(self, metric: MetricData, baseline: float) -> AnomalyResult:
-        """Analyze error rate for anomalies"""
-        threshold = baseline * 3  # 3x baseline is anomalous
+    def _analyze_error_rate(self, batch: MetricBatch, rows: np.ndarray,
+                            baseline: float) -> Optional[List[Tuple[int, AnomalyResult]]]:
+        """Analyze error rates for anomalies"""
+        values = batch.values[rows]
+        hits = np.flatnonzero(values > baseline * 3)  # 3x baseline is anomalous
+        if not hits.size:
+            return None
+        hit_values = values[hits]
+        confidence = np.minimum(0.95, (hit_values - baseline) / baseline)
+        severity = np.where(hit_values > baseline * 5, Severity.CRITICAL, Severity.HIGH)
         
-        if metric.value > threshold:
-            confidence = min(0.95, (metric.value - baseline) / baseline)
-            severity = "critical" if metric.value > baseline * 5 else "high"
-            
-            return AnomalyResult(
+        results = []
+        for row, value, conf, code in zip(rows[hits].tolist(), hit_values.tolist(),
+                                          confidence.tolist(), severity.tolist()):
+            sev = Severity(code)
+            results.append((row, AnomalyResult(
                 detected=True,
-                confidence=confidence,
-                severity=severity,
-                metric=metric.metric_name,
-                service=metric.service,
-                explanation=f"Error rate {metric.value:.3f} is {metric.value/baseline:.1f}x higher than baseline ({baseline:.3f}). This indicates potential issues with service reliability.",
+                confidence=conf,
+                severity=sev,
+                metric=batch.metric_names[batch.metric_codes[row]],
+                service=batch.services[batch.service_codes[row]],
+                explanation=f"Error rate {value:.3f} is {value/baseline:.1f}x higher than baseline ({baseline:.3f}). This indicates potential issues with service reliability.",
                 recommended_actions=[
                     "Investigate recent deployments or configuration changes",
                     "Check application logs for specific error patterns",
                     "Verify external dependencies are functioning properly",
                     "Consider rolling back to previous version if issues persist"
                 ],
-                impact_estimate=f"${int(metric.value * 1000)}/hour in lost revenue" if severity == "critical" else "Medium business impact"
-            )
+                impact_estimate=f"${int(value * 1000)}/hour in lost revenue" if sev is Severity.CRITICAL else "Medium business impact"
+            )))
         
-        return AnomalyResult(detected=False, confidence=0.0, severity="none", metric=metric.metric_name, service=metric.service, explanation="Normal error rate", recommended_actions=[], impact_estimate="None")
+        return results
     
-    def _analyze_response_time(self, metric: MetricData, baseline: float) -> AnomalyResult:
-        """Analyze response time for anomalies"""
-        threshold = baseline * 2  # 2x baseline response time is concerning
+    def _analyze_response_time(self, batch: MetricBatch, rows: np.ndarray,
+                               baseline: float) -> Optional[List[Tuple[int, AnomalyResult]]]:
+        """Analyze response times for anomalies"""
+        values = batch.values[rows]
+        hits = np.flatnonzero(values > baseline * 2)  # 2x baseline response time is concerning
+        if not hits.size:
+            return None
+        hit_values = values[hits]
+        confidence = np.minimum(0.9, (hit_values - baseline) / baseline)
+        severity = np.where(hit_values > baseline * 4, Severity.HIGH, Severity.MEDIUM)
         
-        if metric.value > threshold:
-            confidence = min(0.9, (metric.value - baseline) / baseline)
-            severity = "high" if metric.value > baseline * 4 else "medium"
-            
-            return AnomalyResult(
+        results = []
+        for row, value, conf, code in zip(rows[hits].tolist(), hit_values.tolist(),
+                                          confidence.tolist(), severity.tolist()):
+            sev = Severity(code)
+            results.append((row, AnomalyResult(
                 detected=True,
-                confidence=confidence,
-                severity=severity,
-                metric=metric.metric_name,
-                service=metric.service,
-                explanation=f"Response time {metric.value:.3f}s is {metric.value/baseline:.1f}x higher than baseline ({baseline:.3f}s). Users may experience slow application performance.",
+                confidence=conf,
+                severity=sev,
+                metric=batch.metric_names[batch.metric_codes[row]],
+                service=batch.services[batch.service_codes[row]],
+                explanation=f"Response time {value:.3f}s is {value/baseline:.1f}x higher than baseline ({baseline:.3f}s). Users may experience slow application performance.",
                 recommended_actions=[
                     "Scale up application pods to handle increased load",
                     "Check database query performance and connection pools",
                     "Analyze CPU and memory usage patterns",
                     "Review recent code changes for performance regressions"
                 ],
-                impact_estimate="20% user satisfaction decrease" if severity == "high" else "Minor user experience impact"
-            )
+                impact_estimate="20% user satisfaction decrease" if sev is Severity.HIGH else "Minor user experience impact"
+            )))
         
-        return AnomalyResult(detected=False, confidence=0.0, severity="none", metric=metric.metric_name, service=metric.service, explanation="Normal response time", recommended_actions=[], impact_estimate="None")
+        return results
     
-    def _analyze_cpu_usage(self, metric: MetricData, baseline: float) -> AnomalyResult:
+    def _analyze_cpu_usage(self, batch: MetricBatch, rows: np.ndarray,
+                           baseline: float) -> Optional[List[Tuple[int, AnomalyResult]]]:
         """Analyze CPU usage for anomalies"""
-        if metric.value > 0.8:  # 80% CPU usage is concerning
-            confidence = min(0.85, (metric.value - baseline) / baseline)
-            severity = "critical" if metric.value > 0.9 else "high"
-            
-            return AnomalyResult(
+        values = batch.values[rows]
+        hits = np.flatnonzero(values > 0.8)  # 80% CPU usage is concerning
+        if not hits.size:
+            return None
+        hit_values = values[hits]
+        confidence = np.minimum(0.85, (hit_values - baseline) / baseline)
+        severity = np.where(hit_values > 0.9, Severity.CRITICAL, Severity.HIGH)
+        
+        results = []
+        for row, value, conf, code in zip(rows[hits].tolist(), hit_values.tolist(),
+                                          confidence.tolist(), severity.tolist()):
+            sev = Severity(code)
+            results.append((row, AnomalyResult(
                 detected=True,
-                confidence=confidence,
-                severity=severity,
-                metric=metric.metric_name,
-                service=metric.service,
-                explanation=f"CPU usage {metric.value:.1%} is critically high (baseline: {baseline:.1%}). This may indicate resource exhaustion or potential security issues like crypto-mining.",
+                confidence=conf,
+                severity=sev,
+                metric=batch.metric_names[batch.metric_codes[row]],
+                service=batch.services[batch.service_codes[row]],
+                explanation=f"CPU usage {value:.1%} is critically high (baseline: {baseline:.1%}). This may indicate resource exhaustion or potential security issues like crypto-mining.",
                 recommended_actions=[
                     "Immediately check for unusual processes or security breaches",
                     "Scale horizontal pod autoscaler limits if legitimate load",
                     "Investigate potential memory leaks or infinite loops",
                     "Review resource requests and limits configuration"
                 ],
-                impact_estimate="Service degradation imminent" if severity == "critical" else "Performance degradation likely"
-            )
+                impact_estimate="Service degradation imminent" if sev is Severity.CRITICAL else "Performance degradation likely"
+            )))
         
-        return AnomalyResult(detected=False, confidence=0.0, severity="none", metric=metric.metric_name, service=metric.service, explanation="Normal CPU usage", recommended_actions=[], impact_estimate="None")
+        return results
+
+# Per-anomaly report section, up to the list of recommended actions
+ANOMALY_SECTION_TEMPLATE = (
+    "\n"
+    "## Anomaly #{index}: {severity}\n"
+    "**Service:** {service}\n"
+    "**Metric:** {metric}\n"
+    "**Confidence:** {confidence:.1%}\n"
+    "**Impact:** {impact}\n"
+    "\n"
+    "**🤖 AI Analysis:**\n"
+    "{explanation}\n"
+    "\n"
+    "**📋 Recommended Actions:**\n"
+)
+ANOMALY_SECTION_FOOTER = "\n" + "-" * 40 + "\n"
 
 class ExplainableAIReporter:
     """Generate human-readable incident reports with AI explanations"""
     
-    def generate_incident_report(self, anomalies: List[AnomalyResult]) -> str:
-        """Generate a comprehensive incident report"""
+    def generate_incident_report(self, anomalies: List[AnomalyResult], out: IO[str],
+                                 generated_at: Optional[datetime] = None) -> None:
+        """
+        Generate a comprehensive incident report
+        The report is streamed to out piece by piece rather than built in memory
+        """
+        w = out.write
         if not anomalies:
-            return "✅ No anomalies detected. All systems operating normally."
+            w("✅ No anomalies detected. All systems operating normally.")
+            return
+        
+        # Sort by severity, most severe first
+        sorted_anomalies = sorted(anomalies, key=attrgetter("severity"))
         
-        # Sort by severity
-        severity_order = {"critical": 0, "high": 1, "medium": 2, "low": 3}
-        sorted_anomalies = sorted(anomalies, key=lambda x: severity_order.get(x.severity, 4))
+        if generated_at is None:
+            generated_at = datetime.utcnow()
         
-        report = []
-        report.append("🚨 ANOMALY DETECTION REPORT")
-        report.append("=" * 50)
-        report.append(f"Generated: {datetime.utcnow().isoformat()}Z")
-        report.append(f"Total Anomalies: {len(anomalies)}")
-        report.append("")
+        w("🚨 ANOMALY DETECTION REPORT\n")
+        w("=" * 50 + "\n")
+        w(f"Generated: {generated_at.isoformat()}Z\n")
+        w(f"Total Anomalies: {len(anomalies)}\n")
         
         for i, anomaly in enumerate(sorted_anomalies, 1):
-            report.append(f"## Anomaly #{i}: {anomaly.severity.upper()}")
-            report.append(f"**Service:** {anomaly.service}")
-            report.append(f"**Metric:** {anomaly.metric}")
-            report.append(f"**Confidence:** {anomaly.confidence:.1%}")
-            report.append(f"**Impact:** {anomaly.impact_estimate}")
-            report.append("")
-            report.append(f"**🤖 AI Analysis:**")
-            report.append(anomaly.explanation)
-            report.append("")
-            report.append("**📋 Recommended Actions:**")
-            for action in anomaly.recommended_actions:
-                report.append(f"- {action}")
-            report.append("")
-            report.append("-" * 40)
-            report.append("")
+            w(ANOMALY_SECTION_TEMPLATE.format(
+                index=i,
+                severity=anomaly.severity.name,
+                service=anomaly.service,
+                metric=anomaly.metric,
+                confidence=anomaly.confidence,
+                impact=anomaly.impact_estimate,
+                explanation=anomaly.explanation
+            ))
+            w("".join(["- " + action + "\n" for action in anomaly.recommended_actions]))
+            w(ANOMALY_SECTION_FOOTER)
         
         # Add correlation analysis
         if len(anomalies) > 1:
-            report.append("## 🔗 Correlation Analysis")
-            report.append("Multiple anomalies detected simultaneously.")
-            report.append("This pattern suggests a systemic issue that may require coordinated response.")
-            report.append("")
-        
-        return "\n".join(report)
+            w("\n")
+            w("## 🔗 Correlation Analysis\n")
+            w("Multiple anomalies detected simultaneously.\n")
+            w("This pattern suggests a systemic issue that may require coordinated response.\n")
 
-def simulate_metrics() -> List[MetricData]:
+def simulate_metrics(count: int = 20) -> MetricBatch:
     """Generate simulated metrics data"""
-    services = ["ai-devops-demo", "product-details", "payments-service", "user-profiles"]
-    metrics = []
+    services = ("ai-devops-demo", "product-details", "payments-service", "user-profiles")
+    metric_names = ("error_rate", "cpu_usage")
+    error_rate, cpu_usage = range(len(metric_names))
+    rng = np.random.default_rng()
     
-    base_time = datetime.utcnow()
+    service_codes = rng.integers(len(services), size=count, dtype=np.int32)
     
-    for i in range(20):  # Generate 20 data points
-        timestamp = base_time - timedelta(minutes=i*5)
-        service = random.choice(services)
-        
-        # Simulate some anomalies
-        if random.random() < 0.2:  # 20% chance of anomaly
-            if random.random() < 0.5:
-                # Error rate spike
-                metrics.append(MetricData(
-                    timestamp=timestamp,
-                    service=service,
-                    metric_name="error_rate",
-                    value=random.uniform(0.1, 0.3),  # High error rate
-                    labels={"endpoint": "/api/upload"}
-                ))
-            else:
-                # CPU spike
-                metrics.append(MetricData(
-                    timestamp=timestamp,
-                    service=service,
-                    metric_name="cpu_usage",
-                    value=random.uniform(0.85, 0.95),  # High CPU
-                    labels={"pod": f"{service}-{random.randint(1,3)}"}
-                ))
-        else:
-            # Normal metrics
-            metrics.append(MetricData(
-                timestamp=timestamp,
-                service=service,
-                metric_name="error_rate",
-                value=random.uniform(0.01, 0.04),  # Normal error rate
-                labels={"endpoint": "/api/health"}
-            ))
+    # Simulate some anomalies: 20% of points, split evenly between
+    # error rate spikes and CPU spikes
+    anomalous = rng.random(count) < 0.2
+    cpu_spike = anomalous & (rng.random(count) < 0.5)
+    metric_codes = np.where(cpu_spike, cpu_usage, error_rate).astype(np.int16)
+    values = np.select(
+        [cpu_spike, anomalous],
+        [rng.uniform(0.85, 0.95, count),  # High CPU
+         rng.uniform(0.1, 0.3, count)],  # High error rate
+        default=rng.uniform(0.01, 0.04, count)  # Normal error rate
+    )
+    # Label sets: health endpoint, upload endpoint, then one pod label per
+    # (service, pod 1-3) pair
+    pods_per_service = 3
+    label_sets = ((("endpoint", "/api/health"),), (("endpoint", "/api/upload"),)) + tuple(
+        (("pod", f"{service}-{pod}"),)
+        for service in services for pod in range(1, pods_per_service + 1)
+    )
+    pod_label_codes = 2 + service_codes * pods_per_service + rng.integers(pods_per_service, size=count)
+    label_codes = np.select([cpu_spike, anomalous], [pod_label_codes, 1], default=0).astype(np.int32)
+    
+    # One data point every 5 minutes, newest first
+    base_time = np.datetime64(datetime.utcnow(), "us")
+    timestamps = base_time - np.arange(count) * np.timedelta64(5, "m")
     
-    return metrics
+    return MetricBatch(
+        timestamps=timestamps,
+        service_codes=service_codes,
+        metric_codes=metric_codes,
+        values=values,
+        label_codes=label_codes,
+        services=services,
+        metric_names=metric_names,
+        label_sets=label_sets
+    )
 
 def main():
     """Main execution function for demonstration"""
@@ -269,13 +361,14 @@ def main():
     anomalies = detector.detect_anomalies(metrics)
     
     # Generate and display report
-    report = reporter.generate_incident_report(anomalies)
-    print(report)
+    generated_at = datetime.utcnow()
+    reporter.generate_incident_report(anomalies, sys.stdout, generated_at)
+    print()
     
     # Save report to file
     report_file = f"anomaly_report_{int(time.time())}.txt"
-    with open(report_file, 'w') as f:
-        f.write(report)
+    with open(report_file, 'w', buffering=1 << 16) as f:
+        reporter.generate_incident_report(anomalies, f, generated_at)
     
     logger.info(f"📄 Report saved to: {report_file}")
     